@@ -1,17 +1,18 @@
 # api for reconciliation
 # handles file uploads and processing
 
-import os
+import hashlib
 import shutil
 import tempfile
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 import math
 
+import aiofiles
+import orjson
 from fastapi import FastAPI, File, UploadFile, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import numpy as np
+from fastapi.responses import JSONResponse
 
 # import our processors
 import sys
@@ -20,7 +21,10 @@ from processors import (
     process_statement,
     process_settlement,
     reconcile_data,
-    generate_reconciliation_report
+    generate_reconciliation_report,
+    can_use_lazy,
+    reconcile_files_lazy,
+    FrameCache
 )
 
 # create app
@@ -42,6 +46,12 @@ app.add_middleware(
 # file types we accept
 ALLOWED = {'.csv', '.xlsx', '.xls'}
 
+# upload chunk size (1mb)
+CHUNK_SIZE = 1 << 20
+
+# processed frames keyed by upload digest, see RECON_CACHE_SIZE / RECON_CACHE_DIR
+frame_cache = FrameCache()
+
 
 def check_file(filename):
     """check if file ext is valid"""
@@ -49,50 +59,61 @@ def check_file(filename):
     return ext in ALLOWED
 
 
-def save_file(upload_file):
-    """save uploaded file to temp"""
-    suffix = Path(upload_file.filename).suffix
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(upload_file.file, tmp)
-        return Path(tmp.name)
+async def save_file(upload_file):
+    """
+    save uploaded file to its own temp dir without blocking the event loop
+    returns the path and a digest of the contents, hashed while copying
+    """
+    tmp_dir = Path(tempfile.mkdtemp())
+    fpath = tmp_dir / Path(upload_file.filename).name
+    h = hashlib.blake2b(digest_size=16)
+    
+    try:
+        async with aiofiles.open(fpath, 'wb') as f:
+            while chunk := await upload_file.read(CHUNK_SIZE):
+                h.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        # caller never gets the path, so clean up here
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    
+    return fpath, h.hexdigest()
 
 
-def clean_val(val):
-    """make value json safe"""
-    if val is None:
-        return None
-    if isinstance(val, float):
-        if math.isnan(val) or math.isinf(val):
-            return None
-        return val
-    if isinstance(val, (np.floating, np.integer)):
-        val = val.item()
-        if isinstance(val, float) and (math.isnan(val) or math.isinf(val)):
-            return None
-        return val
-    if isinstance(val, np.ndarray):
-        return val.tolist()
-    if pd.isna(val):
-        return None
-    return val
-
-
-def df_to_list(df, limit=None):
-    """convert df to list of dicts"""
+def remove_file(fpath):
+    """remove saved upload and its temp dir"""
+    if fpath:
+        shutil.rmtree(fpath.parent, ignore_errors=True)
+
+
+class OrjsonResponse(JSONResponse):
+    """json response serialized with orjson, handles numpy values"""
+    
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def df_to_json(df, limit=None):
+    """
+    convert df to a json array of records
+    to_json writes NaN / inf as null so no per cell cleanup is needed,
+    the text is embedded as is by OrjsonResponse without parsing it again
+    """
     if limit:
         df = df.head(limit)
     
-    records = df.to_dict(orient='records')
-    
-    # clean each record
-    result = []
-    for r in records:
-        clean_r = {}
-        for k, v in r.items():
-            clean_r[k] = clean_val(v)
-        result.append(clean_r)
-    
-    return result
+    return orjson.Fragment(df.to_json(orient='records', date_format='iso',
+                                      double_precision=15))
+
+
+def tag_counts(df):
+    """
+    rows per reconcile tag
+    the tag is categorical, so tags with no rows are left out
+    """
+    cnts = df['Reconcile_Tag'].value_counts()
+    return cnts[cnts > 0].to_dict()
 
 
 def safe_num(val, default=0.0):
@@ -115,19 +136,24 @@ async def health():
 
 
 # main reconcile endpoint
-@app.post("/api/reconcile")
+@app.post("/api/reconcile", response_class=OrjsonResponse)
 async def reconcile(
     statement_file: UploadFile = File(...),
     settlement_file: UploadFile = File(...),
     limit: int = Query(50),
+    offset: int = Query(0, ge=0),
     statement_amount_col: str = Query("Settle.Amt"),
     settlement_amount_col: str = Query("estimate_amount_usd"),
     settlement_pin_col: str = Query("Partner_Pin"),
     settlement_type_col: str = Query("Type"),
     settlement_payout_col: str = Query("PayoutRoundAmt"),
-    settlement_rate_col: str = Query("APIRate")
+    settlement_rate_col: str = Query("APIRate"),
+    prune_cols: bool = Query(False)
 ):
-    """main endpoint for reconciling files"""
+    """
+    main endpoint for reconciling files
+    prune_cols skips loading columns reconciliation doesnt use
+    """
     
     # check files
     if not check_file(statement_file.filename):
@@ -141,42 +167,74 @@ async def reconcile(
     
     try:
         # save files
-        st_path = save_file(statement_file)
-        set_path = save_file(settlement_file)
+        st_path, st_digest = await save_file(statement_file)
+        set_path, set_digest = await save_file(settlement_file)
         
-        # process statement
-        try:
-            st_df = process_statement(st_path)
-        except Exception as e:
-            raise HTTPException(status_code=422, detail=f"statement error: {str(e)}")
+        if can_use_lazy(st_path, set_path):
+            # polars streaming pipeline for csv inputs
+            try:
+                results = reconcile_files_lazy(
+                    st_path,
+                    set_path,
+                    statement_amount_col=statement_amount_col,
+                    settlement_amount_col=settlement_amount_col,
+                    settlement_pin_col=settlement_pin_col,
+                    settlement_type_col=settlement_type_col,
+                    settlement_payout_col=settlement_payout_col,
+                    settlement_rate_col=settlement_rate_col,
+                    limit=limit,
+                    offset=offset,
+                    prune_cols=prune_cols
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=f"input error: {str(e)}")
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"reconcile error: {str(e)}")
+        else:
+            # process statement
+            try:
+                st_df = frame_cache.get_or_create(
+                    st_digest,
+                    process_statement,
+                    st_path,
+                    amount_col=statement_amount_col,
+                    prune_cols=prune_cols
+                )
+            except Exception as e:
+                raise HTTPException(status_code=422, detail=f"statement error: {str(e)}")
         
-        # process settlement
-        try:
-            set_df = process_settlement(
-                set_path,
-                pin_col=settlement_pin_col,
-                type_col=settlement_type_col,
-                payout_col=settlement_payout_col,
-                rate_col=settlement_rate_col
-            )
-        except Exception as e:
-            raise HTTPException(status_code=422, detail=f"settlement error: {str(e)}")
+            # process settlement
+            try:
+                set_df = frame_cache.get_or_create(
+                    set_digest,
+                    process_settlement,
+                    set_path,
+                    pin_col=settlement_pin_col,
+                    type_col=settlement_type_col,
+                    payout_col=settlement_payout_col,
+                    rate_col=settlement_rate_col,
+                    prune_cols=prune_cols
+                )
+            except Exception as e:
+                raise HTTPException(status_code=422, detail=f"settlement error: {str(e)}")
         
-        # reconcile
-        try:
-            results = reconcile_data(
-                st_df, 
-                set_df,
-                statement_amount_col=statement_amount_col,
-                settlement_amount_col=settlement_amount_col
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"reconcile error: {str(e)}")
+            # reconcile
+            try:
+                results = reconcile_data(
+                    st_df, 
+                    set_df,
+                    statement_amount_col=statement_amount_col,
+                    settlement_amount_col=settlement_amount_col,
+                    limit=limit,
+                    offset=offset
+                )
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"reconcile error: {str(e)}")
         
         # build response
         s = results['summary']
         
-        return {
+        return OrjsonResponse({
             "success": True,
             "message": "done",
             "summary": {
@@ -192,28 +250,27 @@ async def reconcile(
                 "max_variance": safe_num(s.max_variance),
                 "min_variance": safe_num(s.min_variance)
             },
-            "category_5": df_to_list(results['category_5'], limit),
-            "category_6": df_to_list(results['category_6'], limit),
-            "category_7": df_to_list(results['category_7'], limit),
+            "category_5": df_to_json(results['category_5']),
+            "category_6": df_to_json(results['category_6']),
+            "category_7": df_to_json(results['category_7']),
             "pagination": {
                 "limit": limit,
-                "category_5_total": len(results['category_5']),
-                "category_6_total": len(results['category_6']),
-                "category_7_total": len(results['category_7'])
+                "offset": offset,
+                "category_5_total": s.category_5_count,
+                "category_6_total": s.category_6_count,
+                "category_7_total": s.category_7_count
             }
-        }
+        })
         
     finally:
         # cleanup
-        if st_path and st_path.exists():
-            os.unlink(st_path)
-        if set_path and set_path.exists():
-            os.unlink(set_path)
+        remove_file(st_path)
+        remove_file(set_path)
 
 
 
 # process statement only
-@app.post("/api/process/statement")
+@app.post("/api/process/statement", response_class=OrjsonResponse)
 async def proc_statement(file: UploadFile = File(...)):
     """process statement file"""
     
@@ -223,19 +280,19 @@ async def proc_statement(file: UploadFile = File(...)):
     fpath = None
     
     try:
-        fpath = save_file(file)
+        fpath, digest = await save_file(file)
         
         try:
-            df = process_statement(fpath)
+            df = frame_cache.get_or_create(digest, process_statement, fpath)
         except Exception as e:
             raise HTTPException(status_code=422, detail=f"error: {str(e)}")
         
         # stats
-        tags = df['Reconcile_Tag'].value_counts().to_dict()
+        tags = tag_counts(df)
         pins_found = int(df['Partner_Pin'].notna().sum())
         pins_missing = int(df['Partner_Pin'].isna().sum())
         
-        return {
+        return OrjsonResponse({
             "success": True,
             "message": "done",
             "stats": {
@@ -245,16 +302,15 @@ async def proc_statement(file: UploadFile = File(...)):
                 "tags": tags
             },
             "columns": df.columns.tolist(),
-            "preview": df_to_list(df, 20)
-        }
+            "preview": df_to_json(df, 20)
+        })
         
     finally:
-        if fpath and fpath.exists():
-            os.unlink(fpath)
+        remove_file(fpath)
 
 
 # process settlement only
-@app.post("/api/process/settlement")
+@app.post("/api/process/settlement", response_class=OrjsonResponse)
 async def proc_settlement(
     file: UploadFile = File(...),
     pin_col: str = Query("Partner_Pin"),
@@ -270,10 +326,12 @@ async def proc_settlement(
     fpath = None
     
     try:
-        fpath = save_file(file)
+        fpath, digest = await save_file(file)
         
         try:
-            df = process_settlement(
+            df = frame_cache.get_or_create(
+                digest,
+                process_settlement,
                 fpath,
                 pin_col=pin_col,
                 type_col=type_col,
@@ -284,10 +342,10 @@ async def proc_settlement(
             raise HTTPException(status_code=422, detail=f"error: {str(e)}")
         
         # stats
-        tags = df['Reconcile_Tag'].value_counts().to_dict()
+        tags = tag_counts(df)
         amt_stats = df['estimate_amount_usd'].describe().to_dict()
         
-        return {
+        return OrjsonResponse({
             "success": True,
             "message": "done",
             "stats": {
@@ -301,12 +359,11 @@ async def proc_settlement(
                 }
             },
             "columns": df.columns.tolist(),
-            "preview": df_to_list(df, 20)
-        }
+            "preview": df_to_json(df, 20)
+        })
         
     finally:
-        if fpath and fpath.exists():
-            os.unlink(fpath)
+        remove_file(fpath)
 
 
 # run server
@@ -56,7 +56,10 @@ def main():
         print(f"{'='*60}")
         
         try:
-            statement_df = process_statement(args.statement)
+            statement_df = process_statement(
+                args.statement,
+                save_path=output_dir / 'processed_statement.xlsx'
+            )
             
             print(f"✓ Loaded {len(statement_df)} records")
             print(f"\nPartner Pin Extraction:")
@@ -65,7 +68,8 @@ def main():
             
             print(f"\nReconciliation Tags:")
             for tag, count in statement_df['Reconcile_Tag'].value_counts().items():
-                print(f"  - {tag}: {count}")
+                if count:
+                    print(f"  - {tag}: {count}")
             
             # Save processed file
             output_path = output_dir / 'processed_statement.csv'
@@ -94,7 +98,8 @@ def main():
             
             print(f"\nReconciliation Tags:")
             for tag, count in settlement_df['Reconcile_Tag'].value_counts().items():
-                print(f"  - {tag}: {count}")
+                if count:
+                    print(f"  - {tag}: {count}")
             
             # Save processed file
             output_path = output_dir / 'processed_settlement.csv'
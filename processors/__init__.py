@@ -3,11 +3,16 @@
 from .statement import process_statement
 from .settlement import process_settlement
 from .reconciler import reconcile_data, generate_reconciliation_report, ReconciliationSummary
+from .lazy import can_use_lazy, reconcile_files_lazy
+from .cache import FrameCache
 
 __all__ = [
     'process_statement', 
     'process_settlement',
     'reconcile_data',
     'generate_reconciliation_report',
-    'ReconciliationSummary'
+    'ReconciliationSummary',
+    'can_use_lazy',
+    'reconcile_files_lazy',
+    'FrameCache'
 ]
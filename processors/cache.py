@@ -0,0 +1,171 @@
+# cache module
+# lru cache of processed frames keyed by file digest
+# so re-uploading the same file skips parsing and tagging
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from .reader import FAST_IO
+
+# how many processed frames to keep in memory, 0 turns the cache off
+CACHE_SIZE = int(os.environ.get('RECON_CACHE_SIZE', '32'))
+
+# parquet copies on disk so other worker processes can reuse them
+# they go in a subdir of this dir, an empty value turns the disk copies off
+CACHE_DIR = os.environ.get('RECON_CACHE_DIR', '/tmp/recon-cache')
+
+# subdir the cache owns, nothing outside it is touched
+FRAMES_SUBDIR = 'frames'
+
+# parquet copies are named by key, other files are left alone
+DISK_NAME = re.compile(r'[0-9a-f]{32}\.parquet')
+
+# bump when processing output changes so old disk copies are never served
+CACHE_VERSION = 1
+
+
+class FrameCache:
+    """
+    thread safe lru cache of processed dataframes
+    cached frames are shared, callers must not modify them
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, cache_dir=CACHE_DIR):
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) / FRAMES_SUBDIR if cache_dir else None
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, fn, digest, suffix, kwargs):
+        """key covers the file and its type, the processor and its options"""
+        opts = sorted(kwargs.items())
+        raw = f"v{CACHE_VERSION}|{fn.__name__}|{digest}|{suffix}|{opts}|fast_io={FAST_IO}"
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            df = self._frames.get(key)
+            if df is not None:
+                self._frames.move_to_end(key)
+            return df
+
+    def put(self, key, df):
+        """add frame, evicted frames lose their disk copy too"""
+        if self.maxsize <= 0:
+            return
+        evicted = []
+        with self._lock:
+            self._frames[key] = df
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.maxsize:
+                evicted.append(self._frames.popitem(last=False)[0])
+        for old in evicted:
+            self.remove_disk(old)
+
+    def disk_path(self, key):
+        return self.cache_dir / f"{key}.parquet"
+
+    def private_dir(self):
+        """
+        create the cache subdir, readable by the api user only
+        an existing subdir is used as is, raises if it isnt ours and private
+        """
+        self.cache_dir.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.cache_dir.mkdir(mode=0o700)
+            return
+        except FileExistsError:
+            pass
+        
+        st = os.lstat(self.cache_dir)
+        if (not os.path.isdir(self.cache_dir) or os.path.islink(self.cache_dir)
+                or st.st_uid != os.getuid() or st.st_mode & 0o077):
+            raise PermissionError(f"cache dir {self.cache_dir} is not private")
+
+    def read_disk(self, key):
+        """load parquet copy if there is one, None otherwise"""
+        if self.cache_dir is None:
+            return None
+        path = self.disk_path(key)
+        try:
+            self.private_dir()
+            if not path.exists():
+                return None
+            df = pd.read_parquet(path)
+            # mark as recently used for prune_disk
+            os.utime(path)
+            return df
+        except Exception:
+            # unreadable copy only costs a cache miss
+            return None
+
+    def remove_disk(self, key):
+        if self.cache_dir is None:
+            return
+        try:
+            self.disk_path(key).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def prune_disk(self):
+        """
+        keep at most maxsize parquet copies, oldest go first
+        covers copies left by other workers or earlier runs
+        """
+        try:
+            files = [p for p in self.cache_dir.glob('*.parquet') if DISK_NAME.fullmatch(p.name)]
+            files.sort(key=lambda p: p.stat().st_mtime)
+            for path in files[:-self.maxsize]:
+                path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def write_disk(self, key, df):
+        """
+        best effort parquet copy, failures only cost a cache miss
+        the dir and files are private to the user running the api
+        """
+        if self.cache_dir is None:
+            return
+        tmp = self.cache_dir / f"{key}.{os.getpid()}.tmp"
+        try:
+            self.private_dir()
+            df.to_parquet(tmp, engine='pyarrow', compression='snappy', index=False)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self.disk_path(key))
+        except Exception:
+            # pyarrow rejects some frames (eg mixed str / int object columns)
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return
+        self.prune_disk()
+
+    def get_or_create(self, digest, fn, fpath, **kwargs):
+        """
+        returns fn(fpath, **kwargs), reusing an earlier result
+        for the same file digest and options
+        """
+        if self.maxsize <= 0:
+            return fn(fpath, **kwargs)
+
+        key = self.make_key(fn, digest, Path(fpath).suffix.lower(), kwargs)
+
+        df = self.get(key)
+        if df is not None:
+            return df
+
+        df = self.read_disk(key)
+        if df is None:
+            df = fn(fpath, **kwargs)
+            self.write_disk(key, df)
+
+        self.put(key, df)
+        return df
@@ -0,0 +1,225 @@
+# lazy module
+# polars streaming pipeline for large csv files
+# does load, tagging and reconciliation in one lazy query
+
+import os
+from pathlib import Path
+
+from .reconciler import ReconciliationSummary, is_paged
+
+# opt in to the polars pipeline with USE_POLARS=1
+USE_POLARS = os.environ.get('USE_POLARS', '0') == '1'
+
+TAG_OK = 'Should Reconcile'
+TAG_SKIP = 'Should Not Reconcile'
+
+
+def can_use_lazy(*paths):
+    """lazy pipeline only handles csv files"""
+    return USE_POLARS and all(Path(p).suffix.lower() == '.csv' for p in paths)
+
+
+def scan_columns(fpath, skip_rows, wanted, text_cols, prune_cols=False):
+    """
+    scan csv, types are inferred over the whole file like pandas does
+    text_cols are read as strings, prune_cols keeps only wanted columns
+    """
+    import polars as pl
+
+    lf = pl.scan_csv(fpath, skip_rows=skip_rows, infer_schema_length=None,
+                     schema_overrides={c: pl.String for c in text_cols})
+    found = lf.collect_schema().names()
+    if prune_cols:
+        lf = lf.select([c for c in found if c in wanted])
+    return lf, found
+
+
+def to_number(lf, col):
+    """like pd.to_numeric with errors='coerce', inferred numbers keep their type"""
+    import polars as pl
+
+    if lf.collect_schema()[col].is_numeric():
+        return pl.col(col)
+    return pl.col(col).cast(pl.Float64, strict=False)
+
+
+def tag_expr(type_col, pin_col, dollar_received=False):
+    """reconcile tag expression, same rules as the pandas taggers"""
+    import polars as pl
+
+    type_norm = pl.col(type_col).str.strip_chars().str.to_lowercase()
+    is_cancel = (type_norm == 'cancel').fill_null(False)
+    is_dup = (pl.len().over(pin_col) > 1) & pl.col(pin_col).is_not_null()
+
+    skip = is_dup & ~is_cancel
+    if dollar_received:
+        skip = skip | (type_norm == 'dollar received').fill_null(False)
+
+    return pl.when(skip).then(pl.lit(TAG_SKIP)).otherwise(pl.lit(TAG_OK)).alias('Reconcile_Tag')
+
+
+def lazy_statement(fpath, amount_col, prune_cols=False):
+    """lazy version of process_statement"""
+    import polars as pl
+
+    required = ['Type', 'PQsTrOptOons']
+    lf, found = scan_columns(fpath, 9, required + [amount_col], required, prune_cols)
+
+    missing = [c for c in required if c not in found]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}. Found: {found}")
+
+    # drop first row (its junk)
+    lf = lf.slice(1)
+    if amount_col in found:
+        lf = lf.with_columns(pl.col(amount_col).cast(pl.Float64, strict=False))
+
+    lf = lf.with_columns(
+        pl.col('PQsTrOptOons').str.extract(r'(\d{11})\s*$', 1).alias('Partner_Pin')
+    )
+    return lf.with_columns(tag_expr('Type', 'Partner_Pin', dollar_received=True))
+
+
+def lazy_settlement(fpath, pin_col, type_col, payout_col, rate_col, prune_cols=False):
+    """lazy version of process_settlement"""
+    import polars as pl
+
+    req_cols = [pin_col, type_col, payout_col, rate_col]
+    lf, found = scan_columns(fpath, 2, req_cols, [pin_col, type_col], prune_cols)
+
+    missing = [c for c in req_cols if c not in found]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}. Found: {found}")
+
+    payout = to_number(lf, payout_col)
+    rate = to_number(lf, rate_col)
+    lf = lf.with_columns(
+        payout,
+        rate,
+        pl.when(rate != 0).then(payout / rate).alias('estimate_amount_usd')
+    )
+    lf = lf.with_columns(tag_expr(type_col, pin_col))
+
+    if pin_col != 'Partner_Pin':
+        lf = lf.rename({pin_col: 'Partner_Pin'})
+    return lf
+
+
+def reconcile_files_lazy(statement_path, settlement_path,
+                         statement_amount_col='Settle.Amt',
+                         settlement_amount_col='estimate_amount_usd',
+                         settlement_pin_col='Partner_Pin',
+                         settlement_type_col='Type',
+                         settlement_payout_col='PayoutRoundAmt',
+                         settlement_rate_col='APIRate',
+                         limit=None, offset=0, prune_cols=False):
+    """
+    polars version of process_statement + process_settlement + reconcile_data
+    runs as one streaming query, frames are converted to pandas at the end
+
+    returns same dict as reconcile_data, limit / offset page the same way
+    """
+    import polars as pl
+
+    st = lazy_statement(statement_path, statement_amount_col, prune_cols)
+    se = lazy_settlement(settlement_path, settlement_pin_col, settlement_type_col,
+                         settlement_payout_col, settlement_rate_col, prune_cols)
+
+    # filter for reconcilable only and prefix cols to avoid conflicts
+    # row numbers remember file order, the join does not keep it
+    def prep(lf, prefix, flag, row):
+        names = lf.collect_schema().names()
+        return (
+            lf.with_row_index(row)
+            .filter(pl.col('Reconcile_Tag') == TAG_OK)
+            .rename({c: f"{prefix}{c}" for c in names if c != 'Partner_Pin'})
+            .with_columns(pl.lit(True).alias(flag))
+        )
+
+    st_rec = prep(st, 'st_', '_in_st', '_st_row')
+    set_rec = prep(se, 'set_', '_in_set', '_set_row')
+    helper_cols = {'_st_row', '_set_row', '_in_st', '_in_set'}
+    st_cols = [c for c in st_rec.collect_schema().names() if c not in helper_cols]
+    set_cols = [c for c in set_rec.collect_schema().names()
+                if c not in helper_cols and c != 'Partner_Pin']
+
+    # full join on pin, null pins never match
+    merged = st_rec.join(set_rec, on='Partner_Pin', how='full', coalesce=True)
+
+    in_st = pl.col('_in_st').fill_null(False)
+    in_set = pl.col('_in_set').fill_null(False)
+    merged = merged.with_columns(
+        pl.when(in_st & in_set).then(5).when(in_set).then(6).otherwise(7).alias('Category')
+    )
+
+    # variance for cat 5
+    st_amt = f"st_{statement_amount_col}"
+    set_amt = f"set_{settlement_amount_col}"
+    if st_amt in st_cols and set_amt in set_cols:
+        st_vals = pl.col(st_amt).cast(pl.Float64, strict=False)
+        variance = pl.col(set_amt).cast(pl.Float64, strict=False) - st_vals
+        merged = merged.with_columns(variance.alias('Variance'))
+        merged = merged.with_columns(
+            pl.when(st_vals != 0)
+            .then(pl.col('Variance') / st_vals * 100)
+            .round(2)
+            .alias('Variance_Percent')
+        )
+    else:
+        merged = merged.with_columns(
+            pl.lit(None, dtype=pl.Float64).alias('Variance'),
+            pl.lit(None, dtype=pl.Float64).alias('Variance_Percent')
+        )
+
+    out_cols = st_cols + set_cols + ['Category', 'Variance', 'Variance_Percent']
+    merged = merged.select(out_cols + ['_st_row', '_set_row'])
+
+    # counts share the scans with the main query
+    def counts(lf):
+        return lf.select(
+            pl.len().alias('total'),
+            (pl.col('Reconcile_Tag') == TAG_OK).sum().alias('rec')
+        )
+
+    st_cnt, set_cnt, merged = pl.collect_all(
+        [counts(st), counts(se), merged], engine='streaming'
+    )
+
+    # same row order as reconcile_data, statement order then settlement order
+    order = {5: ['_st_row', '_set_row'], 6: ['_set_row'], 7: ['_st_row']}
+    cats = {
+        c: merged.filter(pl.col('Category') == c).sort(order[c]).select(out_cols)
+        for c in (5, 6, 7)
+    }
+
+    # summary stats, over all matched rows
+    var_vals = cats[5]['Variance'].drop_nulls().drop_nans().to_pandas()
+
+    summary = ReconciliationSummary(
+        total_statement_records=int(st_cnt['total'][0]),
+        total_settlement_records=int(set_cnt['total'][0]),
+        reconcilable_statement=int(st_cnt['rec'][0]),
+        reconcilable_settlement=int(set_cnt['rec'][0]),
+        category_5_count=cats[5].height,
+        category_6_count=cats[6].height,
+        category_7_count=cats[7].height,
+        total_variance=float(var_vals.sum()) if len(var_vals) > 0 else 0.0,
+        avg_variance=float(var_vals.mean()) if len(var_vals) > 0 else 0.0,
+        max_variance=float(var_vals.max()) if len(var_vals) > 0 else 0.0,
+        min_variance=float(var_vals.min()) if len(var_vals) > 0 else 0.0
+    )
+
+    # only the requested page is converted to pandas
+    if is_paged(limit):
+        cats = {c: df.slice(max(offset, 0), limit) for c, df in cats.items()}
+    merged = pl.concat([cats[5], cats[6], cats[7]])
+
+    cats = {c: df.to_pandas(use_pyarrow_extension_array=True) for c, df in cats.items()}
+
+    return {
+        'category_5': cats[5],
+        'category_6': cats[6],
+        'category_7': cats[7],
+        'summary': summary,
+        'all_merged': merged.to_pandas(use_pyarrow_extension_array=True)
+    }
@@ -0,0 +1,93 @@
+# reader module
+# shared file loading for statement and settlement files
+
+import os
+import importlib.util
+import pandas as pd
+from pathlib import Path
+
+# opt in to the faster readers with FAST_IO=1
+FAST_IO = os.environ.get('FAST_IO', '0') == '1'
+
+
+def is_excel(fpath):
+    """check if file is excel"""
+    return Path(fpath).suffix.lower() in ['.xlsx', '.xls']
+
+
+def col_filter(usecols):
+    """
+    builds usecols callable so missing columns are skipped
+    instead of raising, callers validate required columns
+    """
+    if usecols is None:
+        return None
+    wanted = set(usecols)
+    return lambda c: c in wanted
+
+
+def text_dtype(text_cols):
+    """dtype mapping that reads text_cols as strings, missing columns are ignored"""
+    if not text_cols:
+        return None
+    return {c: str for c in text_cols}
+
+
+def read_excel_fast(fpath, skiprows=0, usecols=None, text_cols=None):
+    """
+    reads excel with polars if available
+    falls back to pandas calamine engine, then the default engine
+    """
+    try:
+        import polars as pl
+        df = pl.read_excel(fpath, read_options={'header_row': skiprows})
+        if usecols is not None:
+            df = df.select([c for c in df.columns if c in set(usecols)])
+        if text_cols:
+            df = df.with_columns([pl.col(c).cast(pl.String) for c in text_cols if c in df.columns])
+        return df.to_pandas(use_pyarrow_extension_array=True)
+    except ImportError:
+        pass
+
+    try:
+        return pd.read_excel(fpath, skiprows=skiprows, usecols=col_filter(usecols),
+                             dtype=text_dtype(text_cols), engine='calamine')
+    except ImportError:
+        return pd.read_excel(fpath, skiprows=skiprows, usecols=col_filter(usecols),
+                             dtype=text_dtype(text_cols))
+
+
+def read_csv_fast(fpath, skiprows=0, usecols=None, text_cols=None):
+    """reads csv with the pyarrow engine if available"""
+    if importlib.util.find_spec('pyarrow') is None:
+        return pd.read_csv(fpath, skiprows=skiprows, usecols=col_filter(usecols),
+                           dtype=text_dtype(text_cols))
+
+    # pyarrow engine wont take a callable, so look at the header first
+    if usecols is not None:
+        header = pd.read_csv(fpath, skiprows=skiprows, nrows=0).columns
+        usecols = [c for c in header if c in set(usecols)]
+
+    # pyarrow engine ignores skiprows, header row index does the same
+    return pd.read_csv(fpath, header=skiprows, usecols=usecols, dtype=text_dtype(text_cols),
+                       engine='pyarrow', dtype_backend='pyarrow')
+
+
+def read_file(fpath, skiprows=0, usecols=None, text_cols=None):
+    """
+    loads csv or excel file into a dataframe
+    usecols limits loading to those column names
+    text_cols are read as strings, so ids keep their leading zeros
+    """
+    fpath = Path(fpath)
+
+    if FAST_IO:
+        if is_excel(fpath):
+            return read_excel_fast(fpath, skiprows, usecols, text_cols)
+        return read_csv_fast(fpath, skiprows, usecols, text_cols)
+
+    if is_excel(fpath):
+        return pd.read_excel(fpath, skiprows=skiprows, usecols=col_filter(usecols),
+                             dtype=text_dtype(text_cols))
+    return pd.read_csv(fpath, skiprows=skiprows, usecols=col_filter(usecols),
+                       dtype=text_dtype(text_cols))
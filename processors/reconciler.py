@@ -1,6 +1,7 @@
 # reconciler module
 # does the matching between statement and settlement
 
+import numpy as np
 import pandas as pd
 from typing import Dict, Any
 from dataclasses import dataclass
@@ -23,22 +24,48 @@ class ReconciliationSummary:
 
 
 def get_reconcilable(df):
-    """filter to only reconcilable rows"""
+    """
+    filter to only reconcilable rows
+    no copy, callers rename which already gives a new frame
+    """
     if 'Reconcile_Tag' not in df.columns:
         raise ValueError("missing Reconcile_Tag column")
-    return df[df['Reconcile_Tag'] == 'Should Reconcile'].copy()
+    return df[df['Reconcile_Tag'] == 'Should Reconcile']
+
+
+def build_pin_index(st_pins, set_pins):
+    """
+    hashes partner pins from both sides in a single pass
+    returns integer pin codes per side, 0 means no pin
+    """
+    codes, uniques = pd.factorize(pd.concat([st_pins, set_pins], ignore_index=True))
+    codes = codes + 1
+    n = len(st_pins)
+    return codes[:n], codes[n:], len(uniques) + 1
+
+
+def is_paged(limit):
+    """limit of None or <= 0 means no paging, every row is returned"""
+    return limit is not None and limit > 0
 
 
 def reconcile_data(statement_df, settlement_df,
                    statement_amount_col='Settle.Amt',
-                   settlement_amount_col='estimate_amount_usd'):
+                   settlement_amount_col='estimate_amount_usd',
+                   limit=None, offset=0):
     """
     main reconciliation function
     matches statement and settlement by Partner_Pin
     
     returns dict with category 5, 6, 7 dataframes and summary
+    rows keep input file order, statement order for 5 and 7, settlement order for 6
+    if limit is above 0 each category frame (and all_merged) only holds
+    rows offset to offset + limit, summary counts are always totals
     """
     
+    # negative offsets start from the first row
+    offset = max(offset, 0)
+    
     # store counts
     total_st = len(statement_df)
     total_set = len(settlement_df)
@@ -58,62 +85,94 @@ def reconcile_data(statement_df, settlement_df,
     st_merge = st_rec.rename(columns=st_cols)
     set_merge = set_rec.rename(columns=set_cols)
     
-    # outer join on partner pin
-    merged = pd.merge(st_merge, set_merge, on='Partner_Pin', 
-                      how='outer', indicator=True)
-    
-    # categorize
-    # both = cat 5, right_only = cat 6, left_only = cat 7
-    merged['Category'] = merged['_merge'].map({
-        'both': 5,
-        'right_only': 6,
-        'left_only': 7
-    })
+    # same column layout as the merge gives, used for every category
+    all_cols = list(st_merge.columns) + [c for c in set_merge.columns if c != 'Partner_Pin']
+    
+    if len(st_merge) == 0 or len(set_merge) == 0:
+        # one side is empty so nothing can match, skip hashing and the join
+        cat5 = st_merge.iloc[:0].reindex(columns=all_cols)
+        cat6 = set_merge
+        cat7 = st_merge
+    else:
+        # hash pins once, then look up which codes appear on each side
+        st_codes, set_codes, n_codes = build_pin_index(
+            st_merge['Partner_Pin'], set_merge['Partner_Pin'])
+        
+        in_st = np.zeros(n_codes, dtype=bool)
+        in_st[st_codes] = True
+        in_set = np.zeros(n_codes, dtype=bool)
+        in_set[set_codes] = True
+        
+        # rows without a pin can never match
+        in_st[0] = False
+        in_set[0] = False
+        
+        st_matched = in_set[st_codes]
+        set_matched = in_st[set_codes]
+        
+        # join only the rows known to match
+        cat5 = pd.merge(st_merge[st_matched], set_merge[set_matched],
+                        on='Partner_Pin', how='inner')
+        
+        # settlement only = cat 6, statement only = cat 7
+        cat6 = set_merge[~set_matched]
+        cat7 = st_merge[~st_matched]
+    
+    cat5_cnt, cat6_cnt, cat7_cnt = len(cat5), len(cat6), len(cat7)
+    
+    # page unmatched rows before building their output columns
+    if is_paged(limit):
+        cat6 = cat6.iloc[offset:offset + limit]
+        cat7 = cat7.iloc[offset:offset + limit]
+    
+    cat5 = cat5.assign(Category=5)
+    cat6 = cat6.reindex(columns=all_cols).assign(Category=6)
+    cat7 = cat7.reindex(columns=all_cols).assign(Category=7)
     
     
     # calc variance for cat 5
     st_amt = f"st_{statement_amount_col}"
     set_amt = f"set_{settlement_amount_col}"
     
-    merged['Variance'] = None
-    merged['Variance_Percent'] = None
-    
-    cat5_mask = merged['Category'] == 5
-    if cat5_mask.any():
-        if st_amt in merged.columns and set_amt in merged.columns:
-            merged.loc[cat5_mask, 'Variance'] = (
-                pd.to_numeric(merged.loc[cat5_mask, set_amt], errors='coerce') -
-                pd.to_numeric(merged.loc[cat5_mask, st_amt], errors='coerce')
-            )
-            
-            # percent variance
-            st_vals = pd.to_numeric(merged.loc[cat5_mask, st_amt], errors='coerce')
-            merged.loc[cat5_mask, 'Variance_Percent'] = (
-                merged.loc[cat5_mask, 'Variance'] / st_vals * 100
-            ).round(2)
-    
-    # split by category
-    cat5 = merged[merged['Category'] == 5].copy()
-    cat6 = merged[merged['Category'] == 6].copy()
-    cat7 = merged[merged['Category'] == 7].copy()
-    
-    # cleanup
+    # float64 NaN columns so variance never falls back to object dtype
     for d in [cat5, cat6, cat7]:
-        if '_merge' in d.columns:
-            d.drop(columns=['_merge'], inplace=True)
-    
+        d['Variance'] = np.full(len(d), np.nan, dtype=np.float64)
+        d['Variance_Percent'] = np.full(len(d), np.nan, dtype=np.float64)
+    
+    if len(cat5) > 0:
+        if st_amt in cat5.columns and set_amt in cat5.columns:
+            # convert each amount column once
+            st_vals = pd.to_numeric(cat5[st_amt], errors='coerce').to_numpy(
+                dtype=np.float64, na_value=np.nan)
+            set_vals = pd.to_numeric(cat5[set_amt], errors='coerce').to_numpy(
+                dtype=np.float64, na_value=np.nan)
+            variance = set_vals - st_vals
+            
+            # percent variance in place on one buffer, zero statement amount stays NaN
+            variance_pct = np.full_like(variance, np.nan)
+            np.divide(variance, st_vals, out=variance_pct, where=st_vals != 0)
+            variance_pct *= 100
+            np.round(variance_pct, 2, out=variance_pct)
+            
+            cat5['Variance'] = variance
+            cat5['Variance_Percent'] = variance_pct
     
-    # summary stats
+    # summary stats, over all matched rows
     var_vals = cat5['Variance'].dropna()
     
+    if is_paged(limit):
+        cat5 = cat5.iloc[offset:offset + limit]
+    
+    merged = pd.concat([cat5, cat6, cat7], ignore_index=True)
+    
     summary = ReconciliationSummary(
         total_statement_records=total_st,
         total_settlement_records=total_set,
         reconcilable_statement=rec_st_cnt,
         reconcilable_settlement=rec_set_cnt,
-        category_5_count=len(cat5),
-        category_6_count=len(cat6),
-        category_7_count=len(cat7),
+        category_5_count=cat5_cnt,
+        category_6_count=cat6_cnt,
+        category_7_count=cat7_cnt,
         total_variance=float(var_vals.sum()) if len(var_vals) > 0 else 0.0,
         avg_variance=float(var_vals.mean()) if len(var_vals) > 0 else 0.0,
         max_variance=float(var_vals.max()) if len(var_vals) > 0 else 0.0,
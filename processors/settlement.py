@@ -1,18 +1,20 @@
 # settlement file processor
 # handles settlement files for reconciliation
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Optional, Union
 
-def load_settlement(fpath):
-    """loads settlement file and cleans it"""
-    fpath = Path(fpath)
-    
-    if fpath.suffix.lower() in ['.xlsx', '.xls']:
-        df = pd.read_excel(fpath, skiprows=2)
-    else:
-        df = pd.read_csv(fpath, skiprows=2)
+from .reader import read_file
+
+def load_settlement(fpath, usecols=None, text_cols=None):
+    """
+    loads settlement file and cleans it
+    usecols limits which columns get loaded
+    text_cols are read as strings
+    """
+    df = read_file(fpath, skiprows=2, usecols=usecols, text_cols=text_cols)
     return df
 
 
@@ -20,68 +22,89 @@ def calc_usd_amount(df, payout_col='PayoutRoundAmt', rate_col='APIRate'):
     """
     calculates usd amount from payout and rate
     formula: payout / rate = usd
+    returns a new frame, input is not modified
     """
-    df = df.copy()
     
     # convert to numbers
-    df[payout_col] = pd.to_numeric(df[payout_col], errors='coerce')
-    df[rate_col] = pd.to_numeric(df[rate_col], errors='coerce')
+    payout_num = pd.to_numeric(df[payout_col], errors='coerce')
+    rate_num = pd.to_numeric(df[rate_col], errors='coerce')
     
-    # calculate usd amt
-    def calc(row):
-        if row[rate_col] != 0:
-            return row[payout_col] / row[rate_col]
-        return None
+    # calculate usd amt, rows with zero rate stay NaN
+    payout = payout_num.to_numpy(dtype=np.float64, na_value=np.nan)
+    rate = rate_num.to_numpy(dtype=np.float64, na_value=np.nan)
+    usd = np.divide(payout, rate, out=np.full_like(payout, np.nan), where=rate != 0)
     
-    df['estimate_amount_usd'] = df.apply(calc, axis=1)
-    return df
+    # shallow copy, setting a whole column never writes into the input
+    # (assign deep copies the frame on pandas 2 without copy on write)
+    out = df.copy(deep=False)
+    out[payout_col] = payout_num
+    out[rate_col] = rate_num
+    out['estimate_amount_usd'] = usd
+    return out
 
 
 
 def tag_settlement(df, pin_col='Partner_Pin', type_col='Type'):
-    """adds reconcile tags to settlement"""
+    """
+    adds reconcile tags to settlement
+    returns a new frame, input is not modified
+    """
     
-    df = df.copy()
-    df['Reconcile_Tag'] = 'Should Reconcile'
+    # normalize the unique type values once, rows compare by category code
+    types = df[type_col].astype('category')
+    type_norm = types.cat.categories.astype(str).str.strip().str.lower()
+    codes = types.cat.codes.to_numpy()
     
-    # find duplicate pins
+    # duplicate pins should not reconcile, except cancel type
+    # one hash lookup against the set of duplicated pins, NaN never counts
     cnts = df[pin_col].value_counts()
-    dups = cnts[cnts > 1].index.tolist()
-    
-    for pin in dups:
-        if pd.isna(pin):
-            continue
-        
-        msk = df[pin_col] == pin
-        df.loc[msk, 'Reconcile_Tag'] = 'Should Not Reconcile'
-        
-        # cancel type should reconcile
-        cancel_msk = df[type_col].str.strip().str.lower() == 'cancel'
-        df.loc[msk & cancel_msk, 'Reconcile_Tag'] = 'Should Reconcile'
+    dups = cnts.index[cnts.to_numpy() > 1]
+    is_dup = df[pin_col].isin(dups).to_numpy(dtype=bool)
+    is_cancel = np.isin(codes, np.flatnonzero(type_norm == 'cancel'))
     
-    return df
+    should_not = is_dup & ~is_cancel
+    tags = pd.Categorical.from_codes(
+        should_not.astype(np.int8),
+        categories=['Should Reconcile', 'Should Not Reconcile']
+    )
+    
+    # shallow copy, see calc_usd_amount
+    out = df.copy(deep=False)
+    out['Reconcile_Tag'] = tags
+    return out
 
 
 def process_settlement(file_path: Union[str, Path],
                        pin_col: str = 'Partner_Pin',
                        type_col: str = 'Type',
                        payout_col: str = 'PayoutRoundAmt',
-                       rate_col: str = 'APIRate') -> pd.DataFrame:
+                       rate_col: str = 'APIRate',
+                       prune_cols: bool = False) -> pd.DataFrame:
     """
     processes settlement file
     - loads and cleans
     - calculates usd amount  
     - adds tags
+    
+    prune_cols only loads the columns reconciliation uses,
+    every other column is dropped from the result
     """
     
-    df = load_settlement(file_path)
+    req_cols = [pin_col, type_col, payout_col, rate_col]
+    df = load_settlement(file_path, usecols=req_cols if prune_cols else None,
+                         text_cols=[pin_col])
     
     # validate cols exist
-    req_cols = [pin_col, type_col, payout_col, rate_col]
     missing = [c for c in req_cols if c not in df.columns]
     if missing:
         raise ValueError(f"Missing required columns: {missing}. Found: {df.columns.tolist()}")
     
+    # pins are ids, keep them as text like the statement pins
+    df[pin_col] = df[pin_col].astype('string')
+    
+    # few unique types, store as categorical
+    df[type_col] = df[type_col].astype('category')
+    
     # calc usd
     df = calc_usd_amount(df, payout_col, rate_col)
     
@@ -1,33 +1,43 @@
 # statement processor
 # this file handles statement file processing
 
+import numpy as np
 import pandas as pd
-import re
 from pathlib import Path
 from typing import Optional, Union
 
+from .reader import read_file
 
-def get_pin(txt):
-    """extract pin from text"""
-    if pd.isna(txt):
-        return None
-    
-    # regex to find 11 digit number at end
-    m = re.search(r'(\d{11})\s*$', str(txt))
-    if m:
-        return m.group(1)
-    return None
 
+# 11 digit pin at end of text
+PIN_PATTERN = r'(?P<pin>\d{11})\s*$'
 
-def load_statement(fpath):
-    """load and clean statement file"""
-    fpath = Path(fpath)
+
+def extract_pins(col):
+    """
+    extract partner pin from each value of a text column
+    arrow backed columns use pyarrow compute, others use str.extract
+    missing or non matching values become NA
+    """
+    if isinstance(col.dtype, pd.ArrowDtype):
+        # pyarrow is installed if the column is arrow backed
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        
+        arr = pa.array(col)
+        if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type):
+            pins = pc.struct_field(pc.extract_regex(arr, PIN_PATTERN), 'pin')
+            return pd.Series(pd.arrays.ArrowExtensionArray(pins), index=col.index)
     
-    # check if excel or csv
-    if fpath.suffix.lower() in ['.xlsx', '.xls']:
-        data = pd.read_excel(fpath, skiprows=9)
-    else:
-        data = pd.read_csv(fpath, skiprows=9)
+    return col.astype('string').str.extract(PIN_PATTERN, expand=False)
+
+
+def load_statement(fpath, usecols=None):
+    """
+    load and clean statement file
+    usecols limits which columns get loaded
+    """
+    data = read_file(fpath, skiprows=9, usecols=usecols)
     
     # drop first row (its junk)
     if len(data) > 0:
@@ -38,44 +48,57 @@ def load_statement(fpath):
 
 
 def tag_statement(df):
-    """add tags to statement data"""
-    
-    df = df.copy()
+    """
+    add tags to statement data
+    returns a new frame, input is not modified
+    """
     
-    # default all to should reconcile
-    df['Reconcile_Tag'] = 'Should Reconcile'
+    # normalize the unique type values once, rows compare by category code
+    types = df['Type'].astype('category')
+    type_norm = types.cat.categories.astype(str).str.strip().str.lower()
+    codes = types.cat.codes.to_numpy()
     
     # dollar received should not reconcile
-    mask1 = df['Type'].str.strip().str.lower() == 'dollar received'
-    df.loc[mask1, 'Reconcile_Tag'] = 'Should Not Reconcile'
-    
-    # handle duplicates
-    counts = df['Partner_Pin'].value_counts()
-    dups = counts[counts > 1].index.tolist()
-    
-    for p in dups:
-        if pd.isna(p):
-            continue
-            
-        # mark all as should not reconcile
-        m = df['Partner_Pin'] == p
-        df.loc[m, 'Reconcile_Tag'] = 'Should Not Reconcile'
-        
-        # only cancel type should reconcile
-        cancel = df['Type'].str.strip().str.lower() == 'cancel'
-        df.loc[m & cancel, 'Reconcile_Tag'] = 'Should Reconcile'
-    
-    return df
+    is_dollar = np.isin(codes, np.flatnonzero(type_norm == 'dollar received'))
+    
+    # duplicate pins should not reconcile, except cancel type
+    # one hash lookup against the set of duplicated pins, NaN never counts
+    cnts = df['Partner_Pin'].value_counts()
+    dups = cnts.index[cnts.to_numpy() > 1]
+    is_dup = df['Partner_Pin'].isin(dups).to_numpy(dtype=bool)
+    is_cancel = np.isin(codes, np.flatnonzero(type_norm == 'cancel'))
+    
+    should_not = is_dollar | (is_dup & ~is_cancel)
+    tags = pd.Categorical.from_codes(
+        should_not.astype(np.int8),
+        categories=['Should Reconcile', 'Should Not Reconcile']
+    )
+    
+    # shallow copy, setting a whole column never writes into the input
+    # (assign deep copies the frame on pandas 2 without copy on write)
+    out = df.copy(deep=False)
+    out['Reconcile_Tag'] = tags
+    return out
 
 
-def process_statement(file_path: Union[str, Path]) -> pd.DataFrame:
+def process_statement(file_path: Union[str, Path],
+                      amount_col: str = 'Settle.Amt',
+                      save_path: Optional[Path] = None,
+                      prune_cols: bool = False) -> pd.DataFrame:
     """
     main fn to process statement file
     does cleaning, pin extraction and tagging
+    
+    prune_cols only loads the columns reconciliation uses,
+    every other column is dropped from the result
+    
+    if save_path is given the processed data is written there,
+    .parquet paths are written as parquet, anything else as excel
     """
     
     # load file
-    df = load_statement(file_path)
+    usecols = ['Type', 'PQsTrOptOons', amount_col] if prune_cols else None
+    df = load_statement(file_path, usecols=usecols)
     
     # check columns
     required = ['Type', 'PQsTrOptOons']
@@ -83,16 +106,26 @@ def process_statement(file_path: Union[str, Path]) -> pd.DataFrame:
     if missing:
         raise ValueError(f"Missing columns: {missing}. Found: {df.columns.tolist()}")
     
-    # get partner pin
-    df['Partner_Pin'] = df['PQsTrOptOons'].apply(get_pin)
+    # amounts as floats, junk values become NaN
+    if amount_col in df.columns:
+        df[amount_col] = pd.to_numeric(df[amount_col], errors='coerce').astype('float64')
+    
+    # few unique types, store as categorical
+    df['Type'] = df['Type'].astype('category')
+    
+    # get partner pin - 11 digit number at end of text
+    df['Partner_Pin'] = extract_pins(df['PQsTrOptOons'])
     
     # add tags
     df = tag_statement(df)
     
     # save processed file
-    file_path = Path(file_path)
-    out = file_path.with_name(f"{file_path.stem}_processed.xlsx")
-    df.to_excel(out, index=False)
+    if save_path is not None:
+        save_path = Path(save_path)
+        if save_path.suffix.lower() == '.parquet':
+            df.to_parquet(save_path, engine='pyarrow', compression='snappy', index=False)
+        else:
+            df.to_excel(save_path, index=False)
     
     return df
 
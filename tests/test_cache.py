@@ -0,0 +1,75 @@
+# cache tests
+# run with: python -m unittest discover tests
+
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from processors.cache import FrameCache, FRAMES_SUBDIR
+
+
+def mixed_frame(fpath):
+    """object column with a str then an int, pyarrow cant write it"""
+    return pd.DataFrame({'Ref': pd.Series(['A-77', 1001], dtype=object)})
+
+
+def plain_frame(fpath):
+    return pd.DataFrame({'Ref': [Path(fpath).name]})
+
+
+class FrameCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unwritable_frame_is_only_a_miss(self):
+        cache = FrameCache(maxsize=4, cache_dir=self.base)
+        df = cache.get_or_create('d1', mixed_frame, 'x.xlsx')
+
+        self.assertEqual(df['Ref'].tolist(), ['A-77', 1001])
+        self.assertIs(cache.get_or_create('d1', mixed_frame, 'x.xlsx'), df)
+        self.assertEqual(os.listdir(self.base / FRAMES_SUBDIR), [])
+
+    def test_empty_dir_turns_disk_off(self):
+        cache = FrameCache(maxsize=4, cache_dir='')
+        self.assertIsNone(cache.cache_dir)
+
+    def test_prune_leaves_other_files_alone(self):
+        os.chmod(self.base, 0o755)
+        other = self.base / 'user_report_1.parquet'
+        plain_frame('a.csv').to_parquet(other)
+
+        cache = FrameCache(maxsize=1, cache_dir=self.base)
+        for i in range(3):
+            cache.get_or_create(f'd{i}', plain_frame, f'{i}.csv')
+
+        frames = self.base / FRAMES_SUBDIR
+        self.assertTrue(other.exists())
+        self.assertEqual(len(os.listdir(frames)), 1)
+        self.assertEqual(stat.S_IMODE(os.stat(self.base).st_mode), 0o755)
+        self.assertEqual(stat.S_IMODE(os.stat(frames).st_mode), 0o700)
+
+    def test_shared_subdir_is_not_used(self):
+        frames = self.base / FRAMES_SUBDIR
+        frames.mkdir(mode=0o755)
+        os.chmod(frames, 0o755)
+
+        cache = FrameCache(maxsize=4, cache_dir=self.base)
+        cache.get_or_create('d1', plain_frame, 'a.csv')
+
+        self.assertEqual(os.listdir(frames), [])
+        self.assertEqual(stat.S_IMODE(os.stat(frames).st_mode), 0o755)
+
+
+if __name__ == '__main__':
+    unittest.main()